@@ -9,16 +9,47 @@ sync_linear_to_gcal.py
 - Optional: GCAL_CALENDAR_ID, TIMEZONE
 """
 
+import io
 import os
+import sys
 import json
+import time
+import random
+import hashlib
+import functools
 import requests
-from datetime import datetime, timedelta, date, time as dt_time
-from dateutil import parser
-import pytz
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timedelta, date, timezone
 from google.oauth2 import service_account
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+# orjson (C) est 2-5x plus rapide que le json stdlib sur les gros payloads
+# Linear; on retombe sur le stdlib si le paquet n'est pas installé.
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj)
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps_sorted(obj):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
+
+    def _json_loads(data):
+        return json.loads(data)
+
+    def _json_dumps_sorted(obj):
+        return json.dumps(obj, sort_keys=True).encode()
+
 # Configuration via env
 LINEAR_API_KEY = os.environ.get("LINEAR_API_KEY")
 GCAL_CALENDAR_ID = os.environ.get("GCAL_CALENDAR_ID", "primary")
@@ -26,104 +57,273 @@ GOOGLE_SERVICE_ACCOUNT_JSON = os.environ.get("GOOGLE_SERVICE_ACCOUNT_JSON")
 GOOGLE_APPLICATION_CREDENTIALS = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
 LINEAR_GRAPHQL_URL = "https://api.linear.app/graphql"
 TIMEZONE = os.environ.get("TIMEZONE", "UTC")
+
+# tzinfo UTC du stdlib (C, plus léger que pytz) lié une fois au niveau module
+UTC = timezone.utc
+_ZERO_OFFSET = timedelta(0)
 SEARCH_WINDOW_DAYS = int(os.environ.get("SEARCH_WINDOW_DAYS", "365"))
 
+# Nombre max de requêtes par batch HTTP Google (limite documentée de l'API)
+GCAL_BATCH_LIMIT = 50
+
+# Statuts Google considérés comme transitoires (quota, 5xx): on retente
+RETRIABLE_STATUS = {403, 429, 500, 502, 503, 504}
+
+
+# Sortie bufferisée: sur les runners CI (stdout en line-buffered), chaque
+# print du chemin chaud est un syscall write(). On accumule tout dans un
+# buffer mémoire et on flush une seule fois en fin de run (finally).
+_OUT = io.StringIO()
+
+def log(msg):
+    _OUT.write(msg)
+    _OUT.write("\n")
+
+def flush_log():
+    sys.stdout.write(_OUT.getvalue())
+    sys.stdout.flush()
+    _OUT.seek(0)
+    _OUT.truncate(0)
+
 if not LINEAR_API_KEY:
     raise SystemExit("Missing environment variable: LINEAR_API_KEY is required")
 
+# Session HTTP partagée: keep-alive (évite un handshake TLS par requête),
+# pool de connexions et retries automatiques avec backoff sur les 429/5xx.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    # allowed_methods doit inclure POST: nos requêtes GraphQL sont des POST
+    # mais ce sont des lectures idempotentes, donc rejouables sans risque.
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"POST"})
+    )
+))
+
+# JSON du service account (plusieurs KB) parsé une seule fois à l'import
+_SERVICE_ACCOUNT_INFO = None
+if GOOGLE_SERVICE_ACCOUNT_JSON:
+    try:
+        _SERVICE_ACCOUNT_INFO = _json_loads(GOOGLE_SERVICE_ACCOUNT_JSON)
+    except ValueError as e:
+        raise SystemExit(f"Invalid GOOGLE_SERVICE_ACCOUNT_JSON: {e}")
+
+@functools.lru_cache(maxsize=1)
 def build_gcal_service():
+    """
+    Construit le client Calendar. Mémoïsé: dans un worker chaud (cron,
+    Cloud Function), les invocations suivantes réutilisent le service
+    au lieu de reconstruire credentials + client discovery (~500ms).
+    """
     credentials = None
     if GOOGLE_APPLICATION_CREDENTIALS and os.path.exists(GOOGLE_APPLICATION_CREDENTIALS):
         credentials = service_account.Credentials.from_service_account_file(
             GOOGLE_APPLICATION_CREDENTIALS, scopes=["https://www.googleapis.com/auth/calendar"]
         )
-    else:
-        raw = GOOGLE_SERVICE_ACCOUNT_JSON
-        if raw:
-            try:
-                info = json.loads(raw)
-            except json.JSONDecodeError as e:
-                raise SystemExit(f"Invalid GOOGLE_SERVICE_ACCOUNT_JSON: {e}")
-            credentials = service_account.Credentials.from_service_account_info(
-                info, scopes=["https://www.googleapis.com/auth/calendar"]
-            )
+    elif _SERVICE_ACCOUNT_INFO:
+        credentials = service_account.Credentials.from_service_account_info(
+            _SERVICE_ACCOUNT_INFO, scopes=["https://www.googleapis.com/auth/calendar"]
+        )
     if not credentials:
         raise SystemExit("Missing Google credentials: set GOOGLE_APPLICATION_CREDENTIALS (path) or GOOGLE_SERVICE_ACCOUNT_JSON (content)")
-    service = build("calendar", "v3", credentials=credentials, cache_discovery=False)
+    # Un seul échange JWT -> access token, tout de suite: sinon chaque
+    # transport http créé paresseusement peut déclencher le sien.
+    credentials.refresh(GoogleAuthRequest())
+    # static_discovery: utilise le document discovery embarqué dans le
+    # paquet — aucun fetch réseau (~500KB) ni cache disque nécessaire.
+    service = build("calendar", "v3", credentials=credentials, static_discovery=True)
     return service
 
 def linear_query(query, variables=None):
     headers = {
         "Authorization": LINEAR_API_KEY,
-        "Content-Type": "application/json"
+        "Content-Type": "application/json",
+        # explicite même si requests l'envoie par défaut: les descriptions
+        # d'issues compressent très bien (5-10x). Pas de br: urllib3 ne
+        # décode brotli que si le paquet brotli est installé (il ne l'est pas).
+        "Accept-Encoding": "gzip, deflate"
     }
     payload = {"query": query, "variables": variables or {}}
-    resp = requests.post(LINEAR_GRAPHQL_URL, json=payload, headers=headers, timeout=30)
+    resp = SESSION.post(LINEAR_GRAPHQL_URL, data=_json_dumps(payload), headers=headers, timeout=30)
     if resp.status_code != 200:
-        print("Linear API request failed")
-        print("Status:", resp.status_code)
-        print("Response body:", resp.text)
+        log("Linear API request failed")
+        log(f"Status: {resp.status_code}")
+        log(f"Response body: {resp.text}")
         resp.raise_for_status()
-    data = resp.json()
+    data = _json_loads(resp.content)
     if "errors" in data:
-        print("Linear GraphQL errors:", json.dumps(data["errors"], indent=2))
+        log("Linear GraphQL errors: " + json.dumps(data["errors"], indent=2))
         raise RuntimeError("Linear GraphQL returned errors")
     return data
 
-def get_issues_with_metadata(limit=200):
-    """
-    Récupère les issues avec toutes les métadonnées enrichies:
-    - description de l'issue
-    - projet (nom + description)
-    - parent issue
-    - sub-issues (children)
-    - labels
-    - dueDate (date de livraison)
-    """
-    query = """
-    query($limit: Int) {
-      issues(first: $limit) {
+# Requête GraphQL hoistée au niveau module: construite une seule fois,
+# et la même chaîne est renvoyée à Linear à chaque appel (cache serveur).
+ISSUES_PROJECTS_QUERY = """
+query($il: Int, $pl: Int, $ic: String, $pc: String, $wi: Boolean!, $wp: Boolean!) {
+  issues(first: $il, after: $ic) @include(if: $wi) {
+    pageInfo {
+      endCursor
+      hasNextPage
+    }
+    nodes {
+      id
+      title
+      description
+      url
+      dueDate
+      createdAt
+      startedAt
+      completedAt
+      project {
+        ...ProjectFields
+      }
+      parent {
+        id
+        title
+        url
+      }
+      children {
         nodes {
-          id
           title
-          description
           url
-          dueDate
-          createdAt
-          startedAt
-          completedAt
-          project {
-            id
-            name
-            description
-            url
-            targetDate
-          }
-          parent {
-            id
-            title
-            url
-          }
-          children {
-            nodes {
-              id
-              title
-              url
-            }
-          }
-          labels {
-            nodes {
-              id
-              name
-              color
-            }
-          }
+        }
+      }
+      labels {
+        nodes {
+          name
+          color
         }
       }
     }
+  }
+  projects(first: $pl, after: $pc, filter: { targetDate: { null: false } }) @include(if: $wp) {
+    pageInfo {
+      endCursor
+      hasNextPage
+    }
+    nodes {
+      ...ProjectFields
+    }
+  }
+}
+
+fragment ProjectFields on Project {
+  id
+  name
+  description
+  url
+  targetDate
+}
+"""
+
+def get_issues_and_projects(issue_limit=200, project_limit=100, issue_cursor=None, project_cursor=None,
+                            with_issues=True, with_projects=True):
     """
-    res = linear_query(query, {"limit": limit})
-    return res.get("data", {}).get("issues", {}).get("nodes", [])
+    Récupère en une seule requête GraphQL:
+    - les issues avec toutes les métadonnées enrichies (description, projet,
+      parent, sub-issues, labels, dueDate)
+    - les projects avec leur targetDate
+    Les projects sans targetDate sont filtrés côté serveur (ils seraient
+    skippés de toute façon); les issues ne sont pas filtrées sur dueDate
+    car l'échelle de dates de get_best_date_for_issue sait se rabattre
+    sur targetDate/completedAt/startedAt/createdAt. Les curseurs
+    permettent de paginer au-delà des limites par page.
+    Retourne (issues, projects, page_info).
+    """
+    variables = {
+        "il": issue_limit,
+        "pl": project_limit,
+        "ic": issue_cursor,
+        "pc": project_cursor,
+        "wi": with_issues,
+        "wp": with_projects,
+    }
+    res = linear_query(ISSUES_PROJECTS_QUERY, variables)
+    data = res.get("data", {})
+    issues = data.get("issues", {}).get("nodes", [])
+    projects = data.get("projects", {}).get("nodes", [])
+    page_info = {
+        "issues": data.get("issues", {}).get("pageInfo", {}),
+        "projects": data.get("projects", {}).get("pageInfo", {}),
+    }
+    return issues, projects, page_info
+
+def get_all_issues_and_projects(issue_page_size=50, project_page_size=50):
+    """
+    Itère sur toutes les pages d'issues et de projects via les curseurs
+    pageInfo, au lieu de s'arrêter silencieusement à la première page.
+    Pages de 50: reste sous la limite de complexité GraphQL de Linear
+    (les issues embarquent projet, parent, children et labels).
+    Un côté épuisé est exclu des requêtes suivantes (@include), et la
+    Session keep-alive amortit le coût des pages successives.
+    Retourne (issues, projects).
+    """
+    issues, projects = [], []
+    issue_cursor = project_cursor = None
+    fetch_issues = fetch_projects = True
+    while fetch_issues or fetch_projects:
+        page_issues, page_projects, page_info = get_issues_and_projects(
+            issue_limit=issue_page_size,
+            project_limit=project_page_size,
+            issue_cursor=issue_cursor,
+            project_cursor=project_cursor,
+            with_issues=fetch_issues,
+            with_projects=fetch_projects,
+        )
+        issues.extend(page_issues)
+        projects.extend(page_projects)
+        if fetch_issues:
+            info = page_info["issues"]
+            fetch_issues = bool(info.get("hasNextPage"))
+            issue_cursor = info.get("endCursor")
+        if fetch_projects:
+            info = page_info["projects"]
+            fetch_projects = bool(info.get("hasNextPage"))
+            project_cursor = info.get("endCursor")
+    return issues, projects
+
+def _content_hash(body):
+    """
+    Empreinte courte (blake2b, plus rapide que SHA1 dans hashlib) des champs
+    sémantiques de l'événement (summary/description/start/end). Stockée dans
+    extendedProperties.private.content_hash pour détecter les items inchangés
+    et éviter un PATCH inutile. Les extendedProperties sont exclues du hash:
+    leurs métadonnées sont déjà reflétées dans la description.
+    """
+    semantic = {k: body.get(k) for k in ("summary", "description", "start", "end")}
+    return hashlib.blake2b(_json_dumps_sorted(semantic), digest_size=8).hexdigest()
+
+def _fast_isoparse(s):
+    """
+    Parse une chaîne ISO-8601 via datetime.fromisoformat (stdlib, ~10x plus
+    rapide que dateutil). Linear renvoie du strict ISO-8601 (YYYY-MM-DD ou
+    RFC3339 avec 'Z'), le stdlib couvre donc tous les cas réels.
+    """
+    return datetime.fromisoformat(s.replace("Z", "+00:00"))
+
+def _in_window(s, days=SEARCH_WINDOW_DAYS):
+    """
+    Vrai si la date ISO est à moins de `days` jours d'aujourd'hui.
+    Permet d'ignorer les items historiques sans dépenser d'appel API.
+    """
+    d = date.fromisoformat(s[:10])
+    return abs((d - date.today()).days) <= days
+
+def date_iso_from_value(v):
+    """
+    Normalise une valeur de date Linear (dueDate/targetDate) en 'YYYY-MM-DD'.
+    Chemin rapide sans allocation: Linear renvoie déjà ce format pour les
+    dates simples, la chaîne est retournée telle quelle.
+    """
+    if not v:
+        return None
+    if len(v) == 10 and v[4] == '-' and v[7] == '-':
+        return v
+    return _fast_isoparse(v).date().isoformat()
 
 def to_rfc3339(dt: datetime):
     """
@@ -132,25 +332,13 @@ def to_rfc3339(dt: datetime):
     if dt is None:
         return None
     if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=pytz.UTC)
-    return dt.astimezone(pytz.UTC).isoformat()
-
-def make_search_window_for_date(target_iso: str, days=SEARCH_WINDOW_DAYS):
-    """Return (timeMin, timeMax) RFC3339 around target_iso"""
-    if not target_iso:
-        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
-        return to_rfc3339(now - timedelta(days=days)), to_rfc3339(now + timedelta(days=days))
-    if "T" in target_iso:
-        t = parser.isoparse(target_iso)
-        if t.tzinfo is None:
-            t = t.replace(tzinfo=pytz.UTC)
-        time_min = t - timedelta(days=days)
-        time_max = t + timedelta(days=days)
-    else:
-        d = parser.isoparse(target_iso).date()
-        time_min = datetime.combine(d - timedelta(days=days), dt_time.min).replace(tzinfo=pytz.UTC)
-        time_max = datetime.combine(d + timedelta(days=days), dt_time.max).replace(tzinfo=pytz.UTC)
-    return to_rfc3339(time_min), to_rfc3339(time_max)
+        dt = dt.replace(tzinfo=UTC)
+    elif dt.tzinfo is not UTC and dt.utcoffset() != _ZERO_OFFSET:
+        # astimezone uniquement si nécessaire — la quasi-totalité de nos
+        # datetimes sont déjà en UTC (ou à offset zéro, ce qui produit la
+        # même chaîne +00:00)
+        dt = dt.astimezone(UTC)
+    return dt.isoformat()
 
 def get_best_date_for_issue(issue):
     """
@@ -185,111 +373,137 @@ def get_best_date_for_issue(issue):
 
     return None, None
 
-def find_event_by_linear_id(service, calendar_id, linear_id, target_date_iso=None):
+def call_with_backoff(request, max_retries=6):
     """
-    Trouve un événement Google Calendar ayant privateExtendedProperty linear_id=<linear_id>.
-    Si target_date_iso fourni, on restreint la fenêtre de recherche autour de cette date.
-    Retourne l'objet événement trouvé ou None.
+    Exécute une requête Google API avec retries exponentiels + jitter sur
+    les erreurs transitoires (quota 403/429, 5xx), conformément aux
+    recommandations Google. Relance l'exception au-delà de max_retries.
     """
-    if not service or not calendar_id or not linear_id:
-        return None
-
-    if target_date_iso:
-        time_min, time_max = make_search_window_for_date(target_date_iso)
-    else:
-        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
-        time_min = to_rfc3339(now - timedelta(days=SEARCH_WINDOW_DAYS))
-        time_max = to_rfc3339(now + timedelta(days=SEARCH_WINDOW_DAYS))
-
+    for n in range(max_retries):
+        try:
+            return request.execute()
+        except HttpError as e:
+            status = getattr(e.resp, "status", None)
+            if status not in RETRIABLE_STATUS or n == max_retries - 1:
+                raise
+            delay = min(2 ** n + random.random(), 64)
+            log(f"⏳ Retriable API error ({status}), retry {n + 1}/{max_retries - 1} in {delay:.1f}s")
+            time.sleep(delay)
+
+def list_synced_events(service, calendar_id, linear_kind):
+    """
+    Liste tous les événements du calendrier marqués linear_kind=issue|project,
+    via le filtre serveur privateExtendedProperty — sans fenêtre temporelle:
+    seuls les événements synchronisés par ce script sont renvoyés, quelle que
+    soit leur date, et pas les événements personnels du calendrier.
+    """
+    events = []
+    events_resource = service.events()  # lié une fois, pas à chaque page
     page_token = None
     while True:
         try:
-            resp = service.events().list(
+            resp = call_with_backoff(events_resource.list(
                 calendarId=calendar_id,
-                timeMin=time_min,
-                timeMax=time_max,
-                privateExtendedProperty=f"linear_id={linear_id}",
+                privateExtendedProperty=f"linear_kind={linear_kind}",
                 singleEvents=True,
                 pageToken=page_token,
-                maxResults=250
-            ).execute()
+                maxResults=2500  # max autorisé par l'API: moins de pages à parcourir
+            ))
         except HttpError as e:
-            print("Error while searching events:", e)
+            log(f"Error while listing events: {e}")
             raise
 
-        items = resp.get("items", []) or []
-        if items:
-            return items[0]
+        events.extend(resp.get("items", []) or [])
         page_token = resp.get("nextPageToken")
         if not page_token:
             break
 
-    return None
+    return events
 
-def format_rich_description(issue):
+def build_linear_event_index(service, calendar_id):
     """
-    Construit une description enrichie pour l'événement Google Calendar
-    avec toutes les métadonnées de l'issue
+    Construit en un scan paginé par kind un index {linear_id: event} des
+    événements déjà synchronisés (marqués par
+    extendedProperties.private.linear_id).
+    Évite un events.list paginé par issue (problème N+1), et couvre aussi
+    les événements dont l'item a été replanifié hors de la plage de dates
+    du run courant — avec une fenêtre temporelle, ils seraient invisibles
+    et l'upsert en créerait un doublon à la nouvelle date.
     """
-    parts = []
-
-    # safe access
-    issue = issue or {}
-    description_text = issue.get("description") or ""
+    index = {}
+    for kind in ("issue", "project"):
+        for ev in list_synced_events(service, calendar_id, kind):
+            linear_id = (ev.get("extendedProperties", {}).get("private", {}) or {}).get("linear_id")
+            if linear_id:
+                index[linear_id] = ev
+    return index
+
+def _description_lines(issue):
+    """
+    Génère les lignes de la description enrichie, une par une.
+    Consommé d'un trait par format_rich_description: pas de liste
+    intermédiaire à faire croître par appels .append successifs.
+    """
+    description_text = issue.get("description")
     if description_text:
-        parts.append("📝 Description de l'issue:")
-        parts.append(description_text)
-        parts.append("")
+        yield "📝 Description de l'issue:"
+        yield description_text
+        yield ""
 
     project = issue.get("project") or {}
     if project:
-        parts.append("📁 Projet:")
-        parts.append(f"  • {project.get('name', 'N/A')}")
+        yield "📁 Projet:"
+        yield f"  • {project.get('name', 'N/A')}"
         if project.get("description"):
-            parts.append(f"  • Description: {project['description']}")
+            yield f"  • Description: {project['description']}"
         if project.get("url"):
-            parts.append(f"  • Lien: {project['url']}")
-        parts.append("")
+            yield f"  • Lien: {project['url']}"
+        yield ""
 
     parent = issue.get("parent") or {}
     if parent and parent.get("title"):
-        parts.append("⬆️ Issue parente:")
-        parts.append(f"  • {parent.get('title', 'N/A')}")
+        yield "⬆️ Issue parente:"
+        yield f"  • {parent.get('title', 'N/A')}"
         if parent.get("url"):
-            parts.append(f"  • Lien: {parent['url']}")
-        parts.append("")
+            yield f"  • Lien: {parent['url']}"
+        yield ""
 
     children = (issue.get("children") or {}).get("nodes") or []
     if children:
-        parts.append("⬇️ Sous-issues:")
+        yield "⬇️ Sous-issues:"
         for child in children:
             child = child or {}
-            parts.append(f"  • {child.get('title', 'N/A')}")
+            yield f"  • {child.get('title', 'N/A')}"
             if child.get("url"):
-                parts.append(f"    {child['url']}")
-        parts.append("")
+                yield f"    {child['url']}"
+        yield ""
 
     labels = (issue.get("labels") or {}).get("nodes") or []
     if labels:
-        parts.append("🏷️ Labels:")
+        yield "🏷️ Labels:"
         for label in labels:
             label = label or {}
             label_text = f"  • {label.get('name', 'N/A')}"
             if label.get("color"):
                 label_text += f" (#{label['color']})"
-            parts.append(label_text)
-        parts.append("")
+            yield label_text
+        yield ""
 
     if issue.get("url"):
-        parts.append("🔗 Lien Linear:")
-        parts.append(issue["url"])
+        yield "🔗 Lien Linear:"
+        yield issue["url"]
 
-    return "\n".join(parts)
+def format_rich_description(issue):
+    """
+    Construit une description enrichie pour l'événement Google Calendar
+    avec toutes les métadonnées de l'issue
+    """
+    return "\n".join(_description_lines(issue or {}))
 
 def build_event_body_from_issue(issue):
     """
     Build Google event body from Linear issue with enriched metadata.
-    Uses dueDate primarily (consistent with original behavior).
+    Uses get_best_date_for_issue's priority ladder (dueDate first).
     Returns None if no usable date present.
     """
     if not isinstance(issue, dict):
@@ -297,29 +511,29 @@ def build_event_body_from_issue(issue):
 
     linear_id = issue.get("id")
     title = issue.get("title") or "No title"
-    due_date = issue.get("dueDate")
+    date_field, date_source = get_best_date_for_issue(issue)
 
-    if not due_date:
+    if not date_field:
         return None
 
     description = format_rich_description(issue)
 
     # date/time handling
-    if "T" in due_date:
+    if "T" in date_field:
         try:
-            start_dt = parser.isoparse(due_date)
+            start_dt = _fast_isoparse(date_field)
             if start_dt.tzinfo is None:
-                start_dt = start_dt.replace(tzinfo=pytz.UTC)
+                start_dt = start_dt.replace(tzinfo=UTC)
         except Exception:
             # fallback parse as date
-            start_dt = datetime.utcnow().replace(tzinfo=pytz.UTC)
+            start_dt = datetime.now(UTC)
         end_dt = start_dt + timedelta(hours=1)
         start = {"dateTime": to_rfc3339(start_dt), "timeZone": TIMEZONE}
         end = {"dateTime": to_rfc3339(end_dt), "timeZone": TIMEZONE}
     else:
-        d = parser.isoparse(due_date).date()
-        start = {"date": d.isoformat()}
-        end = {"date": (d + timedelta(days=1)).isoformat()}
+        day_iso = date_iso_from_value(date_field)
+        start = {"date": day_iso}
+        end = {"date": (date.fromisoformat(day_iso) + timedelta(days=1)).isoformat()}
 
     labels = (issue.get("labels") or {}).get("nodes") or []
     label_names = ",".join([l.get("name", "") for l in labels if isinstance(l, dict) and l.get("name")])
@@ -340,87 +554,239 @@ def build_event_body_from_issue(issue):
                 "project_id": project.get("id", ""),
                 "project_name": project.get("name", ""),
                 "parent_id": parent.get("id", ""),
-                "labels": label_names
+                "labels": label_names,
+                "date_source": date_source or ""
+            }
+        }
+    }
+    body["extendedProperties"]["private"]["content_hash"] = _content_hash(body)
+    return body
+
+def build_event_body_from_project(project):
+    """
+    Build Google event body from a Linear project using its targetDate.
+    Returns None if no targetDate present.
+    """
+    if not isinstance(project, dict):
+        return None
+
+    linear_id = project.get("id")
+    name = project.get("name") or "Sans titre"
+    target_date = project.get("targetDate")
+
+    if not target_date:
+        return None
+
+    parts = []
+    if project.get("description"):
+        parts.append("📝 Description du projet:")
+        parts.append(project["description"])
+        parts.append("")
+    if project.get("url"):
+        parts.append("🔗 Lien Linear:")
+        parts.append(project["url"])
+
+    day_iso = date_iso_from_value(target_date)
+    body = {
+        "summary": f"📁 {name}",
+        "description": "\n".join(parts),
+        "start": {"date": day_iso},
+        "end": {"date": (date.fromisoformat(day_iso) + timedelta(days=1)).isoformat()},
+        "extendedProperties": {
+            "private": {
+                "linear_id": linear_id or "",
+                "linear_kind": "project",
+                "linear_url": project.get("url", "")
             }
         }
     }
+    body["extendedProperties"]["private"]["content_hash"] = _content_hash(body)
     return body
 
-def upsert_event_for_issue(service, calendar_id, issue):
+def upsert_event_for_issue(events_resource, calendar_id, issue, index, batch, pending):
     """
-    Crée ou met à jour un événement Google Calendar pour une issue Linear.
-    Utilise la dueDate de l'issue.
+    Met en file (batch HTTP) la création ou la mise à jour d'un événement
+    Google Calendar pour une issue Linear. Utilise la meilleure date
+    disponible (get_best_date_for_issue) et l'index pré-chargé
+    linear_id -> event.
+    Retourne True si une requête a été ajoutée au batch, None si skip.
     """
     if not isinstance(issue, dict):
         return None
 
     linear_id = issue.get("id")
     title = issue.get("title", "Sans titre")
-    due_date = issue.get("dueDate")
+    date_field, date_source = get_best_date_for_issue(issue)
 
-    if not due_date:
-        print(f"⏭️  Skipping issue '{title}' (ID: {linear_id}) — pas de dueDate définie dans Linear")
+    if not date_field:
+        log(f"⏭️  Skipping issue '{title}' (ID: {linear_id}) — aucune date utilisable dans Linear")
+        return None
+
+    if not _in_window(date_field):
+        log(f"⏭️  Skipping issue '{title}' (ID: {linear_id}) — {date_source} {date_field} hors fenêtre de sync")
         return None
 
     body = build_event_body_from_issue(issue)
     if not body:
-        print(f"⚠️  Could not build event body for issue {linear_id}")
+        log(f"⚠️  Could not build event body for issue {linear_id}")
         return None
 
-    existing = find_event_by_linear_id(service, calendar_id, linear_id, target_date_iso=due_date)
+    existing = index.get(linear_id)
 
     if existing:
-        event_id = existing.get("id")
-        try:
-            updated = service.events().patch(calendarId=calendar_id, eventId=event_id, body=body).execute()
-            print(f"✅ Updated: '{title}' (dueDate: {due_date})")
-            return updated
-        except HttpError as e:
-            print(f"❌ Failed to update event {event_id}: {e}")
-            raise
+        existing_hash = (existing.get("extendedProperties", {}).get("private", {}) or {}).get("content_hash")
+        if existing_hash == body["extendedProperties"]["private"]["content_hash"]:
+            log(f"⏩ Unchanged: '{title}' — patch skipped")
+            return None
+        req = events_resource.patch(calendarId=calendar_id, eventId=existing.get("id"), body=body)
+        batch.add(req, request_id=linear_id)
+        pending[linear_id] = req
+        log(f"🔁 Queued update: '{title}' ({date_source}: {date_field})")
     else:
-        try:
-            created = service.events().insert(calendarId=calendar_id, body=body).execute()
-            print(f"✨ Created: '{title}' (dueDate: {due_date})")
-            return created
-        except HttpError as e:
-            print(f"❌ Failed to create event for issue {linear_id}: {e}")
-            raise
+        req = events_resource.insert(calendarId=calendar_id, body=body)
+        batch.add(req, request_id=linear_id)
+        pending[linear_id] = req
+        log(f"✨ Queued create: '{title}' ({date_source}: {date_field})")
+    return True
 
-def main():
-    service = build_gcal_service()
+def upsert_event_for_project(events_resource, calendar_id, project, index, batch, pending):
+    """
+    Met en file (batch HTTP) la création ou la mise à jour d'un événement
+    Google Calendar pour un project Linear, basé sur sa targetDate.
+    Retourne True si une requête a été ajoutée au batch, None si skip.
+    """
+    if not isinstance(project, dict):
+        return None
 
-    print("🔍 Fetching Linear issues with metadata...")
-    try:
-        issues = get_issues_with_metadata(limit=200)
-    except Exception as e:
-        print(f"❌ Error fetching issues: {e}")
-        raise
+    linear_id = project.get("id")
+    name = project.get("name", "Sans titre")
+    target_date = project.get("targetDate")
 
-    print(f"📊 Found {len(issues)} issues returned by Linear")
+    if not target_date:
+        log(f"⏭️  Skipping project '{name}' (ID: {linear_id}) — pas de targetDate définie dans Linear")
+        return None
 
-    synced_count = 0
-    skipped_count = 0
-    error_count = 0
+    if not _in_window(target_date):
+        log(f"⏭️  Skipping project '{name}' (ID: {linear_id}) — targetDate {target_date} hors fenêtre de sync")
+        return None
 
-    for issue in issues:
+    body = build_event_body_from_project(project)
+    if not body:
+        log(f"⚠️  Could not build event body for project {linear_id}")
+        return None
+
+    existing = index.get(linear_id)
+
+    if existing:
+        existing_hash = (existing.get("extendedProperties", {}).get("private", {}) or {}).get("content_hash")
+        if existing_hash == body["extendedProperties"]["private"]["content_hash"]:
+            log(f"⏩ Unchanged: '{name}' — patch skipped")
+            return None
+        req = events_resource.patch(calendarId=calendar_id, eventId=existing.get("id"), body=body)
+        batch.add(req, request_id=linear_id)
+        pending[linear_id] = req
+        log(f"🔁 Queued update: '{name}' (targetDate: {target_date})")
+    else:
+        req = events_resource.insert(calendarId=calendar_id, body=body)
+        batch.add(req, request_id=linear_id)
+        pending[linear_id] = req
+        log(f"✨ Queued create: '{name}' (targetDate: {target_date})")
+    return True
+
+def main():
+    service = build_gcal_service()
+
+    # Le fetch Linear et le scan du calendrier sont indépendants (l'index
+    # est filtré sur linear_kind, plus de fenêtre dérivée des items):
+    # on les lance en parallèle pour masquer la latence de l'un par l'autre.
+    log("🔍 Fetching Linear issues and indexing calendar events in parallel...")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        items_future = pool.submit(get_all_issues_and_projects)
+        index_future = pool.submit(build_linear_event_index, service, GCAL_CALENDAR_ID)
         try:
-            result = upsert_event_for_issue(service, GCAL_CALENDAR_ID, issue)
-            if result:
-                synced_count += 1
-            else:
-                skipped_count += 1
+            issues, projects = items_future.result()
         except Exception as e:
-            error_count += 1
-            issue_id = issue.get('id') if isinstance(issue, dict) else '<unknown>'
-            print(f"❌ Error processing issue {issue_id}: {e}")
+            log(f"❌ Error fetching issues/projects: {e}")
+            raise
+        index = index_future.result()
+
+    log(f"📊 Found {len(issues)} issues and {len(projects)} projects returned by Linear")
+    log(f"🗂️  Indexed {len(index)} existing events")
+
+    counts = {"synced": 0, "skipped": 0, "errors": 0}
+
+    pending = {}
+    retry_ids = []
+
+    def _on_batch_done(request_id, response, exception):
+        if exception is not None:
+            status = getattr(getattr(exception, "resp", None), "status", None)
+            if status in RETRIABLE_STATUS:
+                # erreur transitoire: on rejoue la requête hors batch
+                # avec backoff après le flush
+                retry_ids.append(request_id)
+                return
+            counts["errors"] += 1
+            log(f"❌ Batch request for item {request_id} failed: {exception}")
+        else:
+            counts["synced"] += 1
+            # request_id == linear_id: on rafraîchit l'index avec l'événement
+            # renvoyé pour que les items suivants voient l'état à jour
+            # (content_hash compris) au lieu de celui du prefetch.
+            if request_id and isinstance(response, dict):
+                index[request_id] = response
+
+    def _flush_batch(batch):
+        call_with_backoff(batch)
+        while retry_ids:
+            rid = retry_ids.pop()
+            try:
+                response = call_with_backoff(pending[rid])
+            except Exception as e:
+                counts["errors"] += 1
+                log(f"❌ Retry for item {rid} failed: {e}")
+                continue
+            counts["synced"] += 1
+            if isinstance(response, dict):
+                index[rid] = response
+
+    batch = service.new_batch_http_request(callback=_on_batch_done)
+    queued_in_batch = 0
+    # Lier la ressource events() une seule fois hors de la boucle: chaque
+    # accès service.events() reconstruit l'objet ressource.
+    events_resource = service.events()
+
+    for upsert_fn, items in ((upsert_event_for_issue, issues), (upsert_event_for_project, projects)):
+        for item in items:
+            try:
+                queued = upsert_fn(events_resource, GCAL_CALENDAR_ID, item, index, batch, pending)
+            except Exception as e:
+                counts["errors"] += 1
+                item_id = item.get('id') if isinstance(item, dict) else '<unknown>'
+                log(f"❌ Error processing item {item_id}: {e}")
+                continue
+
+            if queued:
+                queued_in_batch += 1
+                if queued_in_batch == GCAL_BATCH_LIMIT:
+                    _flush_batch(batch)
+                    batch = service.new_batch_http_request(callback=_on_batch_done)
+                    queued_in_batch = 0
+            else:
+                counts["skipped"] += 1
 
-    print("\n" + "="*50)
-    print("📈 Synchronization Summary:")
-    print(f"  ✅ Synced: {synced_count}")
-    print(f"  ⏭️  Skipped: {skipped_count}")
-    print(f"  ❌ Errors: {error_count}")
-    print("="*50)
+    if queued_in_batch:
+        _flush_batch(batch)
+
+    log("\n" + "="*50)
+    log("📈 Synchronization Summary:")
+    log(f"  ✅ Synced: {counts['synced']}")
+    log(f"  ⏭️  Skipped: {counts['skipped']}")
+    log(f"  ❌ Errors: {counts['errors']}")
+    log("="*50)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        flush_log()